@@ -1,6 +1,11 @@
 import numpy as np
-import pygame
-import matplotlib.pyplot as plt
+
+import profiler as profiling
+from compartments import Compartments
+from recorder import Recorder
+from scheduler import Scheduler
+from spatial import CellList, DenseGrid, SparseGrid, pixel_keys
+from streams import Streams
 
 size = 1700, 900 # size of screen
 width = 5   # width of individuals
@@ -13,15 +18,18 @@ grey = 100, 100, 100
 # population parameters:
 n = 2000     # total population size
 number_of_populations = 9   # number of different "countries"
+world_size = size   # size of the simulated world the population squares are packed into (can be larger than the screen)
+occupancy = "dense"     # occupancy backend: "dense" (int32 matrix, memory proportional to the world area) or "sparse" (hash table, memory proportional to n)
 square_dist = 20    # 1/2 distance between two population squares
 speed_healthy = 2   # number of pixels individuals can move in the x and y direction each iteration
 speed_sick = 2
+move_attempts = 3   # number of random steps an individual proposes each iteration until one leads to a free pixel (stays put otherwise)
 travel_speed = 7
 daily_travellers = 20   # number of individuals that will travel from one population to another within each day
 day_length = 100    # number of iterations a day lasts (days are used for data plotting and daily travellers)
 
 # virus parameters:
-infection_radius = 5    # radius in pixels around each infected individual within a healthy individual has a risk of infection
+infection_radius = 5    # radius in pixels around each infected individual within a healthy individual has a risk of infection (euclidean distance)
 infection_risk = 0.5   # risk of infection per iteration for a healthy individual within an infected individual's infection radius
 recovery_time = 4   # number of days it takes an infected person to recover and become healthy again
 incubation_period = 2  # number of days it takes for an infected individual before there is a chance of death
@@ -37,11 +45,27 @@ number_of_healthy_people = False
 number_of_recovered_people = True
 
 
+# Parameters class - one set of simulation parameters (every parameter not given defaults to the module-level value above):
+class Parameters:
+    names = ("size", "width", "n", "number_of_populations", "world_size", "occupancy", "square_dist", "speed_healthy", "speed_sick", "move_attempts", "travel_speed", "daily_travellers", "day_length",
+             "infection_radius", "infection_risk", "recovery_time", "incubation_period", "lethality", "acquired_immunity")
+
+    def __init__(self, **params):
+        for i in params:
+            if i not in self.names:
+                raise ValueError(f"unknown parameter {i!r}")
+        for i in self.names:
+            setattr(self, i, params.get(i, globals()[i]))
+
+    @property
+    def death_risk(self):   # risk of death for each individual each iteration calculated from lethality
+        return 1 - np.power(1-self.lethality, 1/((self.recovery_time-self.incubation_period)*self.day_length))
+
+
 # Population class - creates a list of all separate populations the simulation consists of:
 # (contains information about each population's location and physical boundaries
 class Population:
-    def __init__(self, N, dist, screen):
-        self.screen = screen    # pygame screen object used for simulation
+    def __init__(self, N, dist, size):  # size of the world the squares are packed into
         if int(np.sqrt(N))**2 >= N: # algorithm to create N squares and pack them into the screen
             dimensions = (int(round(np.sqrt(N))), int(round(np.sqrt(N))))   # x squares in a row, y squares in a column (x always equal to or one greater than y)
         else:
@@ -53,259 +77,655 @@ class Population:
                 squares.append((i*self.edge, j*self.edge))
         while len(squares) > N: # delete any squares that are too many (not always x*y squares)
             squares.pop(-1)
-        self.squares = []   # list that contains pygame.Rect objects representing the squares from above
+        self.squares = []   # list that contains (left, top, width, height) tuples representing the squares from above
         for i in squares:
-            self.squares.append(pygame.Rect(i[0]+dist, i[1]+dist, self.edge-2*dist, self.edge-2*dist))  # each Rect ist smaller by square_dist than the original squares in order to have some space between population squares
-        for i in self.squares:
-            pygame.draw.rect(screen, white, i, 2)   # display squares on screen
+            self.squares.append((i[0]+dist, i[1]+dist, self.edge-2*dist, self.edge-2*dist))  # each square ist smaller by square_dist than the original squares in order to have some space between population squares
 
-    def draw_squares(self): # method that gets called every iteration to redraw the squares on the screen
+    def draw_squares(self, screen): # method that gets called every rendered iteration to redraw the squares on the screen
+        import pygame
         for i in self.squares:
-            pygame.draw.rect(self.screen, white, i, 2)
+            pygame.draw.rect(screen, white, i, 2)
+
+
+# Engine class - structure-of-arrays representation of all individuals:
+# (every individual is an index into contiguous numpy arrays; movement, infection, recovery, death and travel run as batched array operations over the whole population)
+class Engine:
+    backends = {"dense": DenseGrid, "sparse": SparseGrid}  # available occupancy backends
+    fields = ("position", "speed", "infected", "infected_at", "event_at", "dies", "population", "travelling", "destination")   # names of the agent arrays
+
+    def __init__(self, populations, params, rng):
+        self.populations = populations  # Population object the individuals live in
+        self.params = params    # Parameters object of the simulation
+        self.rng = rng  # Streams object with one random number stream for each phase of the simulation
+        width = params.width
+        self.bounds = np.array([(x, y, x+w-width, y+h-width) for x, y, w, h in populations.squares], dtype=np.int32)   # inclusive movement boundaries (x_min, y_min, x_max, y_max) of each population square
+        self.centers = np.array([(x+w//2, y+h//2) for x, y, w, h in populations.squares], dtype=np.int32)    # travel destination of each population square
+        if params.occupancy not in self.backends:
+            raise ValueError(f"unknown occupancy backend {params.occupancy!r}")
+        self.occupancy = self.backends[params.occupancy](params.world_size, params.n)   # index of the individual on every occupied pixel
+        self.cells = CellList(params.infection_radius)     # spatial index used to find healthy individuals within the infection radius
+        self.local = np.ones(len(self.bounds), dtype=bool)  # population squares whose individuals this engine simulates (travellers to other squares never arrive)
+        self.departure_share = 1    # share of the daily travellers that depart from this engine
+        self.recovery_time = int(params.recovery_time*params.day_length)    # recovery time in iterations
+        self.incubation_period = int(params.incubation_period*params.day_length)    # incubation period in iterations
+
+        # agent arrays (one entry per individual):
+        self.position = np.empty((0, 2), dtype=np.int32)    # x and y position (top left corner) of each individual
+        self.speed = np.empty(0, dtype=np.int32)    # number of pixels each individual can move in the x and y direction each iteration
+        self.infected = np.empty(0, dtype=np.int8)  # infected status: 0 for healthy, 1 for infected, 2 for recovered, 3 for dead
+        self.infected_at = np.zeros(0, dtype=np.int32)  # iteration each individual has last been infected in
+        self.event_at = np.zeros(0, dtype=np.int32)     # iteration of the scheduled recovery or death of each infected individual
+        self.dies = np.zeros(0, dtype=bool)     # whether the scheduled event of each infected individual is its death (recovery otherwise)
+        self.population = np.empty(0, dtype=np.int32)   # index of the population square each individual belongs to (changes when travelling)
+        self.travelling = np.empty(0, dtype=bool)   # whether each individual is currently in transit between two population squares
+        self.destination = np.empty((0, 2), dtype=np.int32)     # travel destination of each travelling individual
+        self.compartments = Compartments(4)     # individuals grouped by infected status (counts are the number of healthy, infected, recovered and dead individuals)
+        self.travellers = Compartments(2)   # individuals grouped by travelling status (0 for not travelling, 1 for travelling)
+        self.scheduler = Scheduler()    # recovery and death events of infected individuals
+        self.tick = 0   # current iteration (set by the simulation)
+        self.next_departure = None  # iteration the next traveller departs in
+        self.free = []  # indices of individuals that have been handed to another engine (reused by insert_travellers)
+        self.profiler = profiling.disabled  # profiler that counts the work done (set by the simulation)
+
+    @property
+    def n(self):    # number of individuals
+        return len(self.infected)
+
+    # extend method - appends the given number of empty rows to all agent arrays and returns their indices:
+    def extend(self, count):
+        start = self.n
+        for i in self.fields:
+            array = getattr(self, i)
+            setattr(self, i, np.concatenate([array, np.zeros((count,) + array.shape[1:], dtype=array.dtype)]))
+        self.compartments.grow(self.n)
+        self.travellers.grow(self.n)
+        return np.arange(start, self.n)
+
+    # add_agents method - appends individuals with the given infected status to the given population squares:
+    def add_agents(self, infected, population):
+        infected = np.asarray(infected, dtype=np.int8)
+        population = np.asarray(population, dtype=np.int32)
+        ids = self.extend(len(infected))
+        self.population[ids] = population
+        pending = ids   # individuals without an initial position
+        while len(pending):     # propose a pixel within its population square for every pending individual, keep the free ones and propose again for the rest
+            bounds = self.bounds[self.population[pending]]
+            position = self.rng.placement.integers(bounds[:, :2], bounds[:, 2:]+1)
+            free = np.flatnonzero(self.occupancy.get(position) < 0)
+            _, first = np.unique(pixel_keys(position[free]), return_index=True)     # only one individual can be placed on the same pixel
+            placed = free[first]
+            self.position[pending[placed]] = position[placed]
+            self.occupancy.set(position[placed], pending[placed])
+            pending = np.delete(pending, placed)
+        self.speed[ids] = np.where(infected == 1, self.params.speed_sick, self.params.speed_healthy)
+        self.infected[ids] = infected
+        for i in range(4):
+            self.compartments.add(i, ids[infected == i])
+        self.travellers.add(0, ids)
+        self.schedule(ids[infected == 1])
+        return ids
+
+    # set_infected method - changes the infected status of individuals that currently have the given status:
+    def set_infected(self, ids, source, target):
+        self.infected[ids] = target
+        self.compartments.move(ids, source, target)
+        if target == 1 and source != 1:
+            self.schedule(ids)
+
+    # schedule method - decides when individuals infected in the current iteration recover or die and schedules that event:
+    # (each iteration from the incubation period until the recovery time is a chance of death with death_risk, so the
+    # iteration of death follows a geometric distribution; individuals that don't die before the recovery time recover)
+    def schedule(self, ids):
+        ids = np.asarray(ids, dtype=np.intp)
+        first = max(self.incubation_period, 1)  # first infected iteration with a chance of death (the iteration of infection counts as the first)
+        death_risk = self.params.death_risk
+        death = first + self.rng.illness.geometric(death_risk, len(ids)) - 1 if death_risk > 0 else np.full(len(ids), self.recovery_time)
+        self.dies[ids] = death < self.recovery_time
+        self.infected_at[ids] = self.tick
+        self.event_at[ids] = self.tick + np.where(self.dies[ids], death, self.recovery_time) - 1
+        self.scheduler.schedule(self.event_at[ids], ids)
+
+    # move method - moves all living, non-travelling individuals (or the given individuals) one random step within their population square:
+    # (all individuals propose a step at once; those whose pixel is occupied or taken by another individual propose
+    # a new step, at most move_attempts times, and stay where they are afterwards)
+    def move(self, ids=None):
+        if ids is None:
+            ids = np.flatnonzero((self.infected != 3) & ~self.travelling)
+        if not len(ids):
+            return
+        proposed = len(ids)
+        for _ in range(self.params.move_attempts):
+            self.profiler.count("move_rounds")
+            self.profiler.count("move_proposals", len(ids))
+            speed = self.speed[ids][:, None]
+            target = self.position[ids] + self.rng.movement.integers(-speed, speed+1, size=(len(ids), 2))     # random movement in x and y direction
+            bounds = self.bounds[self.population[ids]]
+            np.clip(target, bounds[:, :2], bounds[:, 2:], out=target)   # keep new positions within population square
+            pending = self.occupancy.get(target) >= 0   # occupied pixels can't be moved onto
+            pending &= np.any(target != self.position[ids], axis=1)    # individuals whose step keeps them in place are done
+            candidates = np.flatnonzero(~pending)
+            order = candidates[self.rng.movement.permutation(len(candidates))]   # random priority between individuals competing for the same pixel
+            _, first = np.unique(pixel_keys(target[order]), return_index=True)
+            pending[order] = True
+            pending[order[first]] = False
+            winners, target = ids[order[first]], target[order[first]]
+            self.occupancy.clear(self.position[winners])
+            self.position[winners] = target
+            self.occupancy.set(target, winners)
+            ids = ids[pending]
+            if not len(ids):
+                break
+        self.profiler.count("moves", proposed)
+        self.profiler.count("blocked_moves", len(ids))
+
+    # infect method - infected, non-travelling individuals (or the given individuals) infect healthy individuals of their population within the infection radius:
+    def infect(self, ids=None):
+        if ids is None:
+            ids = self.compartments.ids(1).copy()
+        ids = ids[(self.infected[ids] == 1) & ~self.travelling[ids]]    # only infect others while not travelling
+        if not len(ids):
+            return 0
+        active = np.zeros(len(self.bounds), dtype=bool)     # population squares that contain at least one spreader
+        active[self.population[ids]] = True
+        susceptible = self.compartments.ids(0)  # only healthy, non-immune individuals can be infected
+        susceptible = susceptible[~self.travelling[susceptible] & active[self.population[susceptible]]]
+        self.cells.build(self.position[susceptible], self.population[susceptible], susceptible)
+        _, targets = self.cells.query(self.position[ids], self.population[ids])   # every pair of spreader and healthy individual of the same population within the infection radius
+        new = np.unique(targets[self.rng.infection.random(len(targets)) < self.params.infection_risk])    # every infected neighbour is an independent chance of infection
+        self.profiler.count("spreaders", len(ids))
+        self.profiler.count("infection_pairs", len(targets))
+        self.set_infected(new, 0, 1)
+        self.speed[new] = self.params.speed_sick
+        return len(new)
+
+    # progress method - applies the recoveries and deaths scheduled for the current iteration:
+    def progress(self):
+        ids = self.scheduler.pop(self.tick)
+        ids = ids[(self.infected[ids] == 1) & (self.event_at[ids] == self.tick)]   # skip events of individuals whose infected status has been changed otherwise
+        _, first = np.unique(ids, return_index=True)
+        ids = ids[np.sort(first)]   # indices reused by insert_travellers can still have the event of the removed individual in the same iteration
+        self.profiler.count("events", len(ids))
+
+        # recovery:
+        recovered = ids[~self.dies[ids]]    # infected individuals that have survived the recovery time
+        self.set_infected(recovered, 1, 2 if self.params.acquired_immunity else 0)  # make individuals immune or healthy again
+        self.speed[recovered] = self.params.speed_healthy
+
+        # death:
+        dead = ids[self.dies[ids]]
+        self.set_infected(dead, 1, 3)
+        return len(dead)
+
+    # infected_days method - returns the number of iterations the given individuals have been infected for (0 for individuals that aren't infected):
+    def infected_days(self, ids):
+        return np.where(self.infected[ids] == 1, self.tick - self.infected_at[ids] + 1, 0)
+
+    # set_infected_days method - changes the number of iterations infected individuals (others are skipped) have been infected for:
+    # (their scheduled recovery or death moves along with the infection, events that would be overdue happen in the next iteration)
+    def set_infected_days(self, ids, days):
+        ids = np.asarray(ids, dtype=np.intp)
+        infected = self.infected[ids] == 1
+        ids, days = ids[infected], np.broadcast_to(days, infected.shape)[infected]
+        start = self.tick - days + 1    # iteration of infection that gives the new number of infected iterations
+        self.event_at[ids] = np.maximum(self.event_at[ids] + start - self.infected_at[ids], self.tick + 1)
+        self.infected_at[ids] = start
+        self.scheduler.schedule(self.event_at[ids], ids)    # the old event is skipped since it no longer matches event_at
+
+    # travel method - moves all travelling individuals (or the given individuals) towards their destination and lets them arrive:
+    def travel(self, ids=None):
+        if ids is None:
+            ids = self.travellers.ids(1).copy()
+        ids = ids[self.travelling[ids]]
+        travel_speed = self.params.travel_speed
+        distance = self.destination[ids] - self.position[ids]
+        self.position[ids] += np.where(distance > travel_speed, travel_speed, np.where(distance < -travel_speed, -travel_speed, 0)).astype(np.int32)
+        arrived = ids[np.all(np.abs(self.destination[ids] - self.position[ids]) <= travel_speed, axis=1)]    # arrived within travel_speed pixels of destination
+        arrived = arrived[self.local[self.population[arrived]]]     # travellers to squares of another engine wait to be handed over
+        position = self.position[arrived]
+        arrived = arrived[self.occupancy.get(position) < 0]     # wait while destination location is occupied by another individual
+        position = self.position[arrived]
+        _, first = np.unique(pixel_keys(position), return_index=True)   # only one individual can arrive on the same pixel
+        arrived = arrived[first]
+        self.travelling[arrived] = False
+        self.travellers.move(arrived, 1, 0)
+        self.profiler.count("arrivals", len(arrived))
+        self.occupancy.set(self.position[arrived], arrived)
+
+    # depart method - lets the travellers depart whose departure has been drawn for the current iteration:
+    # (every iteration starts a journey with probability daily_travellers/day_length, so the gaps between departures are drawn from a geometric distribution)
+    def depart(self):
+        departure_risk = min(self.params.daily_travellers/self.params.day_length*self.departure_share, 1)
+        if departure_risk <= 0:
+            return
+        if self.next_departure is None:
+            self.next_departure = self.tick + self.rng.travel.geometric(departure_risk) - 1
+        while self.next_departure <= self.tick:
+            self.start_travel()
+            self.next_departure += self.rng.travel.geometric(departure_risk)
+
+    # start_travel method - randomly selects an individual that isn't travelling or dead and sends it to another population square:
+    def start_travel(self):
+        living = self.compartments.counts[:3]   # healthy, infected and recovered individuals
+        ends = np.cumsum(living)
+        for _ in range(100):    # randomly select a living individual and check whether they aren't already travelling
+            self.profiler.count("departure_attempts")
+            i = self.rng.travel.integers(0, ends[-1]) if ends[-1] else 0
+            compartment = np.searchsorted(ends, i, side="right")
+            if compartment == 3:    # nobody left alive
+                return
+            traveller = self.compartments.ids(compartment)[i - ends[compartment] + living[compartment]]
+            if not self.travelling[traveller]:
+                break
+        else:   # (almost) everybody alive is already travelling
+            return
+        self.travelling[traveller] = True
+        self.travellers.move([traveller], 0, 1)
+        self.occupancy.clear(self.position[[traveller]])    # remove selected individual from occupancy
+        population = self.rng.travel.choice([i for i in range(len(self.bounds)) if i != self.population[traveller]])  # randomly select a population square that the selected individual should travel to
+        self.destination[traveller] = self.centers[population]
+        self.population[traveller] = population
+
+    # remove_travellers method - removes travelling individuals (e.g. to hand them to another engine) and returns their agent arrays:
+    def remove_travellers(self, ids):
+        ids = np.asarray(ids, dtype=np.intp)
+        state = {i: getattr(self, i)[ids].copy() for i in self.fields}
+        for i in range(4):
+            self.compartments.remove(i, ids[self.infected[ids] == i])
+        self.travellers.remove(1, ids)
+        self.event_at[ids] = -1     # cancel scheduled events
+        self.free.extend(ids.tolist())
+        return state
+
+    # insert_travellers method - adds travelling individuals removed from another engine (reusing free indices first) and returns their indices:
+    def insert_travellers(self, state):
+        count = len(state["infected"])
+        reused = min(count, len(self.free))
+        ids = np.concatenate([np.array(self.free[len(self.free)-reused:], dtype=np.intp), self.extend(count-reused)])
+        del self.free[len(self.free)-reused:]
+        for i in self.fields:
+            getattr(self, i)[ids] = state[i]
+        for i in range(4):
+            self.compartments.add(i, ids[self.infected[ids] == i])
+        self.travellers.add(1, ids)
+        infected = ids[self.infected[ids] == 1]
+        self.scheduler.schedule(self.event_at[infected], infected)  # keep the recovery or death drawn by the other engine
+        return ids
+
+
+# Renderer class - optional observer that draws the simulation on a pygame screen (at most every few iterations):
+class Renderer:
+    colours = white, red, blue, grey    # display colour for each infected status (0 healthy, 1 infected, 2 recovered, 3 dead)
+
+    def __init__(self, every=1, size=size):
+        import pygame   # pygame is only needed when rendering
+        self.pygame = pygame
+        pygame.init()
+        self.every = every  # number of iterations between two rendered frames
+        self.screen = pygame.display.set_mode(size)     # pygame screen object the simulation gets displayed on
+
+    def __call__(self, simulation):     # called after every iteration with the Simulation object (or the Epidemic class)
+        if (simulation.iterations - 1) % self.every:
+            return
+        self.screen.fill(black)
+        self.draw_people(simulation.engine)
+        simulation.populations.draw_squares(self.screen)    # draw population squares on screen
+        self.pygame.display.flip()
+
+    # draw_people method - draws all individuals onto the screen in one array operation (individuals outside the screen aren't drawn):
+    def draw_people(self, engine):
+        pixels = self.pygame.surfarray.pixels2d(self.screen)    # direct reference to the screen's pixels (one mapped integer colour per pixel)
+        width = engine.params.width
+        visible = np.all((engine.position >= 0) & (engine.position <= np.array(pixels.shape) - width), axis=1)
+        position = engine.position[visible]
+        colours = np.array([self.screen.map_rgb(i) for i in self.colours], dtype=pixels.dtype)[engine.infected[visible]]
+        for i in range(width):  # draw every individual as a width x width square
+            for j in range(width):
+                pixels[position[:, 0]+i, position[:, 1]+j] = colours
+        del pixels  # unlock screen surface
+
+
+# Simulation class - one independent simulation (parameters, random number generator, world, individuals and statistical data):
+# (any number of simulations can exist side by side; a fixed seed makes a run reproducible)
+class Simulation:
+    def __init__(self, params=None, seed=None, recorder=None, squares=None, profiler=None):     # squares: indices of the population squares this simulation populates (all squares by default)
+        self.setup(params, Streams(seed), recorder, profiler)
+        number = len(self.populations.squares)
+        if squares is None:
+            squares = range(number)
+        self.engine.local[:] = False
+        self.engine.local[list(squares)] = True
+        self.engine.departure_share = len(squares)/number
+        self.engine.add_agents(np.zeros((self.params.n-1)//number*len(squares)), np.repeat(squares, (self.params.n-1)//number))  # distribute n individuals equally among all population squares
+        if 0 in squares:
+            self.engine.add_agents([1], [0])    # add one infected individual
+        self.recorder.start(self)
+
+    # restore classmethod - returns a simulation without individuals that continues from a saved state (filled in by checkpoint.load):
+    @classmethod
+    def restore(cls, params, rng, recorder=None, profiler=None):
+        self = cls.__new__(cls)
+        self.setup(params, rng, recorder, profiler)
+        return self
+
+    # setup method - creates the world, the engine and the statistical data of a simulation (shared by __init__ and restore):
+    def setup(self, params, rng, recorder, profiler):
+        self.params = params if isinstance(params, Parameters) else Parameters(**(params or {}))    # Parameters object (or dict of parameters that differ from the defaults)
+        self.rng = rng  # random number streams used for every random decision of this simulation (one for each phase)
+        self.populations = Population(self.params.number_of_populations, self.params.square_dist, self.params.world_size)     # Population object that contains information about all population squares
+        self.engine = Engine(self.populations, self.params, self.rng)   # Engine object that holds the state of all individuals
+        self.profiler = self.engine.profiler = profiler or profiling.disabled   # Profiler object that times the phases of each iteration (disabled by default)
+
+        self.recorder = recorder or Recorder()  # Recorder object that collects the statistical data
+        self.daily_infections = 0   # number of infections of the current day
+        self.daily_deaths = 0   # number of deaths of the current day
+        self.day = 0    # counter that keeps track of number of days that have passed (one day is day_length iterations long)
+        self.iterations = 0     # counter that keeps track of number of iterations
+
+    # update_world method - called each iteration to update the simulation (moves, infects, heals and transports all individuals at once):
+    def update_world(self):
+        params = self.params
+        profiler = self.profiler
+        self.engine.tick = self.iterations
+        with profiler.phase("movement"):
+            self.engine.move()  # update position for all individuals that aren't travelling
+        with profiler.phase("infection"):
+            self.daily_infections += self.engine.infect()   # update infection status of all individuals
+        with profiler.phase("recovery_death"):
+            self.daily_deaths += self.engine.progress()     # recoveries and deaths scheduled for this iteration
+
+        if params.number_of_populations > 1:    # only move travellers if at least two separate populations exist
+            with profiler.phase("travel"):
+                self.engine.travel()    # update position for all travelling individuals
+                self.engine.depart()    # individuals that start to travel this iteration
+
+        # update statistical data:
+        with profiler.phase("statistics"):
+            if not self.iterations % params.day_length:     # a new day starts
+                self.day += 1   # increment day counter
+            self.iterations += 1    # increment iterations counter
+            self.recorder.record_tick(self, self.iterations)
+            if not self.iterations % params.day_length:     # a full day has passed
+                self.recorder.record_day(self, self.iterations // params.day_length)
+                self.daily_infections = self.daily_deaths = 0
+
+    # series method - returns one series of statistical data (the daily series end with the counts of the current day):
+    def series(self, name):
+        values = self.recorder.series(name)
+        if name == "n_daily_infections":
+            return np.append(values, self.daily_infections)
+        if name == "n_daily_deaths":
+            return np.append(values, self.daily_deaths)
+        return values
+
+    # statistics method - returns the statistical data collected during simulation:
+    def statistics(self):
+        statistics = {i: self.series(i) for i in Recorder.tick_series + Recorder.day_series}
+        statistics.update(day=self.day, iterations=self.iterations)
+        return statistics
+
+    # display_statistics method - plots data collected during simulation:
+    def display_statistics(self, **data):
+        display_statistics(self.recorder, (self.daily_infections, self.daily_deaths), **data)
+
+
+# AgentList class - lazy sequence of Epidemic views over the individuals selected from the engine arrays:
+class AgentList:
+    def __init__(self, select):
+        self.select = select    # function that returns the indices of the selected individuals from the engine
+
+    def ids(self):
+        return self.select(Epidemic.engine)
+
+    def __len__(self):
+        return len(self.ids())
+
+    def __getitem__(self, i):
+        return Epidemic.view(self.ids()[i])
+
+    def __iter__(self):
+        return (Epidemic.view(i) for i in self.ids())
+
+
+# Series class - lazy sequence over one series of statistical data of the simulation the Epidemic class operates on:
+class Series:
+    def __init__(self, name):
+        self.name = name    # name of the series (e.g. n_infected)
+
+    def values(self):
+        return Epidemic.simulation.series(self.name)
+
+    def __len__(self):
+        return len(self.values())
+
+    def __getitem__(self, i):
+        return self.values()[i]
+
+    def __iter__(self):
+        return iter(self.values())
+
+
+# World class - read-only view of an occupancy backend in the shape of the old world matrix:
+# (world[x][y] is the Epidemic object on that pixel, 0 for empty pixels)
+class World:
+    def __init__(self, occupancy):
+        self.occupancy = occupancy  # occupancy backend of the engine
+
+    def __getitem__(self, x):
+        return WorldColumn(self.occupancy, x)
+
+
+# WorldColumn class - one column of a World view:
+class WorldColumn:
+    def __init__(self, occupancy, x):
+        self.occupancy = occupancy
+        self.x = x  # x coordinate of the column
+
+    def __getitem__(self, y):
+        index = self.occupancy.get([[self.x, y]])[0]
+        return Epidemic.view(index) if index >= 0 else 0
 
 
 # Epidemic class - contains all rules for virus spread and people's behaviour:
+# (each Epidemic object is a thin view onto one individual in the engine arrays; the class variables mirror the Simulation object the class currently operates on)
 class Epidemic:
     # class variables:
-    screen = pygame.display.set_mode(size)  # pygame screen object the simulation gets displayed on
-    world = [[0 for i in range(-infection_radius, size[1]+infection_radius+1)] for j in range(-infection_radius, size[0]+infection_radius+1)]   #matrix representation of simulated world (each pixel on screen corresponds to one matrix entry)
-    populations = Population(number_of_populations, square_dist, screen)    # Population object that contains information about all population squares
-    people = []     # list that contains all individuals (healthy, infected, recovered and dead)
-    infected_people = []    # list that contains all infected individuals
-    healthy_people = []     # list that contains all healthy individuals (including recovered ones)
-    dead_people = []    # list that contains all dead individuals
-    recovered_people = []   # list that contains all dead individuals
-    travelling_people = []  # list that contains all individuals currently travelling
-    death_risk = 1 - np.power(1-lethality, 1/((recovery_time-incubation_period)*day_length))    # risk of death for each individual each iteration calculated from lethality
-
-    # statistical data: (lists that are updated each iteration (or each day for n_daily_infections and n_daily_deaths
-    n_daily_deaths = [0]
-    n_daily_infections = [0]
-    n_infected = [1]
-    n_dead = [0]
-    n_healthy = [n-1]   # all individuals healthy at start
-    n_recovered = [0]
+    simulation = None   # Simulation object the class operates on (created by initialise_world)
+    populations = None  # Population object that contains information about all population squares
+    engine = None   # Engine object that holds the state of all individuals
+    world = None    # World view of the simulated world (world[x][y] is the individual on that pixel, 0 for empty pixels; world.occupancy is the backend)
+    people = AgentList(lambda e: np.arange(e.n))    # all individuals (healthy, infected, recovered and dead)
+    infected_people = AgentList(lambda e: e.compartments.ids(1).copy())     # all infected individuals
+    healthy_people = AgentList(lambda e: np.concatenate([e.compartments.ids(0), e.compartments.ids(2)]))    # all healthy individuals (including recovered ones)
+    dead_people = AgentList(lambda e: e.compartments.ids(3).copy())     # all dead individuals
+    recovered_people = AgentList(lambda e: e.compartments.ids(2).copy())    # all recovered individuals
+    travelling_people = AgentList(lambda e: e.travellers.ids(1).copy())     # all individuals currently travelling
+    death_risk = 0  # risk of death for each individual each iteration calculated from lethality
+
+    # statistical data: (read from the Recorder object of the simulation)
+    n_daily_deaths = Series("n_daily_deaths")
+    n_daily_infections = Series("n_daily_infections")
+    n_infected = Series("n_infected")
+    n_dead = Series("n_dead")
+    n_healthy = Series("n_healthy")
+    n_recovered = Series("n_recovered")
     day = 0     # counter that keeps track of number of days that have passed (one day is day_length iterations long)
     iterations = 0  # counter that keeps track of number of iterations of the main game loop
 
     def __init__(self, type, population):   # type 1 for healthy, 2 for infected
-        # instance variables individual for each person:
-        self.population = population    # population square the individual is in (changes when travelling)
-        self.infected_days = 0     # counter that keeps track of how many consecutive days the individual has been infected (used for recovery and death)
-        if type == 1:   # set speed of individual for moving within its population
-            self.speed = speed_healthy
-        else:
-            self.speed = speed_sick
-        self.recovery_time = int(recovery_time*day_length)  # recovery time in iterations
-        self.incubation_period = int(incubation_period*day_length)   # incubation period in iterations
+        self.index = int(Epidemic.engine.add_agents([type-1], [Epidemic.populations.squares.index(population)])[0])     # add a new individual to the engine
 
-        self.travelling = False     # keeps track of whether the individual is currently in transit between two population squares
-        self.destination = []   # contains location of travel destination when individual is travelling
+    # view classmethod - returns an Epidemic object for an existing individual without creating a new one:
+    @classmethod
+    def view(cls, index):
+        self = cls.__new__(cls)
+        self.index = int(index)
+        return self
 
-        if type == 1:   # set infected status: 0 for healthy, 1 for infected, 2 for recovered, 3 for dead
-            self.infected = 0
-        else:
-            self.infected = 1
-        occupied = True
-        while occupied:     # find an initial position for the individual within its population square that isn't already occupied by another individual
-            self.position = [np.random.randint(population.left, population.right-width+1), np.random.randint(population.top, population.bottom-width+1)]    #random position within population square
-            if not Epidemic.world[self.position[0]][self.position[1]]:  # position isn't occupied?
-                occupied = False    # exit while loop (initial position has been found)
-        Epidemic.world[self.position[0]][self.position[1]] = self   # put the individual as an EPidemic object into the world matrix at the initial position
-        Epidemic.people.append(self)    # put individual in people list
-        if self.infected:   # if infected, put individual in infected_people list
-            Epidemic.infected_people.append(self)
-        else:   # if healthy, put individual in healthy_people list
-            Epidemic.healthy_people.append(self)
-        particle_rect = pygame.Rect(self.position[0], self.position[1], width, width)   # create pygame.Rect object for individual that can be displayed on screen
-        if self.infected:   # red square for infected individuals
-            pygame.draw.rect(Epidemic.screen, red, particle_rect, 0)
-        else:   # white square for healthy individuals
-            pygame.draw.rect(Epidemic.screen, white, particle_rect, 0)
+    def __eq__(self, other):
+        return isinstance(other, Epidemic) and self.index == other.index
+
+    def __hash__(self):
+        return self.index
+
+    @property
+    def position(self):
+        return Epidemic.engine.position[self.index]
+
+    @property
+    def speed(self):
+        return int(Epidemic.engine.speed[self.index])
+
+    @speed.setter
+    def speed(self, value):
+        Epidemic.engine.speed[self.index] = value
+
+    @property
+    def infected(self):
+        return int(Epidemic.engine.infected[self.index])
+
+    @infected.setter
+    def infected(self, value):
+        Epidemic.engine.set_infected([self.index], self.infected, value)
+
+    @property
+    def infected_days(self):
+        return int(Epidemic.engine.infected_days([self.index])[0])
+
+    @infected_days.setter
+    def infected_days(self, value):
+        Epidemic.engine.set_infected_days([self.index], value)
+
+    @property
+    def travelling(self):
+        return bool(Epidemic.engine.travelling[self.index])
+
+    @property
+    def population(self):
+        return Epidemic.populations.squares[Epidemic.engine.population[self.index]]
+
+    @property
+    def destination(self):
+        return list(Epidemic.engine.destination[self.index]) if self.travelling else []
 
     # update_position method - moves individual around within its population (not used for travelling):
     def update_position(self):
-        if self.infected != 3:  # only living individuals can move around
-            occupied = True
-            Epidemic.world[self.position[0]][self.position[1]] = 0  # delete current position of individual from world matrix
-            while occupied:     # randomly select next location that isn't already occupied by another individual
-                x_motion = np.random.randint(-self.speed, self.speed+1)     # random movement in x direction
-                y_motion = np.random.randint(-self.speed, self.speed+1)     # random movement in y direction
-                new_x = self.position[0] + x_motion     # new x position
-                new_y = self.position[1] + y_motion     # new y position
-                if self.population.left <= new_x <= self.population.right-width and self.population.top <= new_y <= self.population.bottom-width:   # check whether new position is still within population square
-                    if not Epidemic.world[new_x][new_y]:    # only break while loop when new position isn't occupied
-                        occupied = False
-                        self.position = [new_x, new_y]  # update individual's position
-            Epidemic.world[new_x][new_y] = self     # put new position in world matrix
-
-        # draw person:
-        particle_rect = pygame.Rect(self.position[0], self.position[1], width, width)   # create pygame.Rect object for individual that can be displayed on screen
-        if self.infected == 1:
-            pygame.draw.rect(Epidemic.screen, red, particle_rect, 0)    # red for infected
-        elif self.infected == 2:
-            pygame.draw.rect(Epidemic.screen, blue, particle_rect, 0)   # blue for recovered and immune
-        elif self.infected == 3:
-            pygame.draw.rect(Epidemic.screen, grey, particle_rect, 0)   # grey for dead
-        else:
-            pygame.draw.rect(Epidemic.screen, white, particle_rect, 0)  # white for healthy and not immune
+        if self.infected != 3 and not self.travelling:  # only living individuals can move around
+            Epidemic.engine.move(np.array([self.index]))
 
-    # update_infection method - used on infected individuals for infection of others within the infection radius, recovery and death:
+    # update_infection method - used on infected individuals for infection of others within the infection radius (recovery and death are scheduled when infected):
     def update_infection(self):
-        self.infected_days += 1     # increment counter of infected people
-        if not self.travelling:     # only infect others while not travelling
-            for i in range(-infection_radius, infection_radius + 1):    # check all pixels within infection radius (square-shaped)
-                for j in range(-infection_radius, infection_radius + 1):
-                    if i == 0 and j == 0:   # skip own position
-                        continue
-                    if Epidemic.world[self.position[0] + i][self.position[1] + j]:  # found another individual within infection radius
-                        p_test = Epidemic.world[self.position[0] + i][self.position[1] + j]
-                        if not p_test.infected and p_test.population == self.population:    # p_test can only be infected if it is healthy and not immune and belongs to same population
-                            p_test.infected = np.random.choice([0, 1], p=[1-infection_risk, infection_risk])    # randomly decide whether p_test gets infected based on infection_risk
-                            if p_test.infected:
-                                Epidemic.infected_people.append(p_test)     # add p_test to infected_people list
-                                Epidemic.healthy_people.remove(p_test)  # remove p_test from healthy_people list
-                                Epidemic.n_daily_infections[Epidemic.day - 1] += 1  # update number of daily infections for current day
-                                p_test.speed = speed_sick   # set p_test's speed to speed_sick
-
-        # recovery:
-        if self.infected_days == self.recovery_time:    # infected individual has survived recovery time
-            if acquired_immunity:
-                self.infected = 2   # make individual immune
-                Epidemic.recovered_people.append(self)  # add individual to recovered_people list (only if immune)
-            else:
-                self.infected = 0   # make individual healthy
-            Epidemic.infected_people.remove(self)   # remove individual from infected_people list
-            Epidemic.healthy_people.append(self)    # add individual to healthy people list (contains immune and non-immune people)
-            self.infected_days = 0  # reset infected days counter
-            self.speed = speed_healthy  # set individual's speed back to speed_healthy
-
-        # death:
-        if self.infected_days >= self.incubation_period:    # individual has been infected longer than the incubation period
-            if np.random.choice([0, 1], p=[1-Epidemic.death_risk, Epidemic.death_risk]):     # randomly decide whether individual dies based on death_risk
-                self.infected = 3   # set infected status to dead
-                Epidemic.infected_people.remove(self)   # remove individual from infected_people list
-                Epidemic.dead_people.append(self)   # add individual to dead_people list
-                Epidemic.n_daily_deaths[Epidemic.day-1] += 1    # update daily deaths for current day
+        Epidemic.simulation.daily_infections += Epidemic.engine.infect(np.array([self.index]))
 
     # travel method - used to move individual from one population to another:
     def travel(self):
-        for i in range(2):  # move in direction of destination
-            if self.position[i] < self.destination[i] - travel_speed:
-                self.position[i] += travel_speed
-            elif self.position[i] > self.destination[i] + travel_speed:
-                self.position[i] -= travel_speed
-        if self.destination[0] - travel_speed <= self.position[0] <= self.destination[0] + travel_speed and self.destination[1] - travel_speed <= self.position[1] <= self.destination[1] + travel_speed:   # arrived within travel_speed pixels of destination
-            if not Epidemic.world[self.position[0]][self.position[1]]:  # is destination location occupied by another individual?
-                self.travelling = False     # terminate transit
-                self.destination.clear()    # remove information about destination location
-                Epidemic.travelling_people.remove(self)     # remove individual from travelling_people list
-                Epidemic.world[self.position[0]][self.position[1]] = self   # put individual back in world matrix
-
-        # draw travelling people:
-        particle_rect = pygame.Rect(self.position[0], self.position[1], width, width)   # create pygame.Rect object to display individual on screen
-        if self.infected == 2:
-            pygame.draw.rect(Epidemic.screen, blue, particle_rect, 0)
-        elif self.infected == 1:
-            pygame.draw.rect(Epidemic.screen, red, particle_rect, 0)
-        elif self.infected == 3:
-            pygame.draw.rect(Epidemic.screen, grey, particle_rect, 0)
-        else:
-            pygame.draw.rect(Epidemic.screen, white, particle_rect, 0)
-
+        Epidemic.engine.travel(np.array([self.index]))
 
-    # initialise_world classmethod - called once at the start of the simulation (creates all individuals):
+    # initialise_world classmethod - called once at the start of the simulation (creates a new Simulation object the class operates on):
     @classmethod
-    def initialise_world(cls, n):
-        for i in cls.populations.squares:   # distribute n individuals equally among all population squares
-            for j in range((n-1)//len(cls.populations.squares)):
-                cls.people.append(cls(1, i))   # add each created individual to people list
-        cls.people.append(cls(2, cls.populations.squares[0]))   # add one infected individual
+    def initialise_world(cls, n, params=None, seed=None, recorder=None):
+        cls.attach(Simulation(dict(params or {}, n=n), seed, recorder))
 
-    # update_world classmethod - called each iteration to update the simulation (calls update_position, update_infection and travel methods):
+    # attach classmethod - lets the class operate on the given Simulation object:
+    @classmethod
+    def attach(cls, simulation):
+        cls.simulation = simulation
+        cls.populations = simulation.populations
+        cls.engine = simulation.engine
+        cls.world = World(simulation.engine.occupancy)
+        cls.death_risk = simulation.params.death_risk
+        cls.day = simulation.day
+        cls.iterations = simulation.iterations
+
+    # update_world classmethod - called each iteration to update the simulation:
     @classmethod
     def update_world(cls):
-        for i in cls.people:    # update position for all individuals that aren't travelling
-            if not i.travelling:
-                i.update_position()
-
-        for i in cls.infected_people:   # update infection status of all individuals
-            i.update_infection()
-
-        if number_of_populations > 1:   # only call travel method if at least two separate populations exist
-            for i in cls.travelling_people:     # update position for all travelling individuals
-                i.travel()
-            if np.random.choice([True, False], p=[daily_travellers/day_length, 1-daily_travellers/day_length]):     # randomly decide whether an individual will start to travel next iteration
-                okay = False
-                while not okay:     # randomly select an individual from people list and check whether they aren't already travelling or dead
-                    traveller = Epidemic.people[np.random.randint(0, len(Epidemic.people))]
-                    if not traveller.travelling and traveller.infected != 3:
-                        okay = True
-                traveller.travelling = True     # set travelling status of selected individual to True
-                Epidemic.world[traveller.position[0]][traveller.position[1]] = 0    # remove selected individual from world matrix
-                population = cls.populations.squares[np.random.choice([i for i in range(len(cls.populations.squares)) if cls.populations.squares[i] != traveller.population])]  # randomly select a population square that the selected individual should travel to
-                traveller.destination = list(population.center)     # set center of selected population square as travel destination
-                traveller.population = population   # change selected individual's population to newly selected population
-                cls.travelling_people.append(traveller)     # add selected individual to travelling_people list
+        cls.simulation.update_world()
+        cls.day = cls.simulation.day
+        cls.iterations = cls.simulation.iterations
 
-        # update statistical data:
-        cls.n_infected.append(len(cls.infected_people))
-        cls.n_healthy.append(len(cls.healthy_people))
-        cls.n_dead.append(len(cls.dead_people))
-        cls.n_recovered.append(len(cls.recovered_people))
-        if not cls.iterations % day_length: # only update daily_deaths and daily_infections lists when a full day has passed
-            cls.n_daily_deaths.append(0)
-            cls.n_daily_infections.append(0)
-            cls.day += 1    # increment day counter
-        cls.iterations += 1     # increment iterations counter
-        cls.populations.draw_squares()  # draw population squares on screen
+    # statistics classmethod - returns the statistical data collected during simulation:
+    @classmethod
+    def statistics(cls):
+        return cls.simulation.statistics()
 
     # display_statistics classmethod - plots data collected during simulation:
     @classmethod
     def display_statistics(cls, **data):
-        n = [i for i in range(cls.iterations + 1)]  # x axis (number of iterations)
-        days = [i * day_length for i in range(len(cls.n_daily_deaths))]     # x axis for daily deaths and daily infections (number of days)
-
-        plt.style.use("ggplot")
-        for i in data:  # only plot data specified in kwargs
-            if data[i]:
-                if i == "infected":
-                    plt.plot(n, cls.n_infected, label="Total number of infected people", color="red")
-                if i == "daily_infected":
-                    plt.plot(days, cls.n_daily_infections, label="Infections per day", color="orange")
-                if i == "dead":
-                    plt.plot(n, cls.n_dead, label="Total deaths", color="black")
-                if i == "daily_deaths":
-                    plt.plot(days, cls.n_daily_deaths, label="Deaths per day", color="Purple")
-                if i == "healthy":
-                    plt.plot(n, cls.n_healthy, label="Number of healthy people", color="cyan")
-                if i == "recovered":
-                    plt.plot(n, cls.n_recovered, label="Number of recovered people", color="blue")
-
-        plt.grid(True)
-        plt.legend()
-        plt.show()
-
-
-# initialise epidemic:
-pygame.init()
-Epidemic.initialise_world(n)
-pause = False   # pauses simulation when True
-
-# game loop:
-while 1:
-    Epidemic.screen.fill(black)
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            exit()
-        if event.type == pygame.KEYDOWN:    # press return to pause/resume simulation
-            if event.key == pygame.K_RETURN:
-                pause = not pause
-                if pause:   # plot data when paused
-                    Epidemic.display_statistics(infected=total_number_of_infected_people, daily_infected=daily_number_of_infections, dead=total_number_of_deaths, daily_deaths=daily_number_of_deaths, healthy=number_of_healthy_people, recovered=number_of_recovered_people)
-
-    if not pause:   # run simulation when not paused
-        Epidemic.update_world()
-        pygame.display.flip()
\ No newline at end of file
+        cls.simulation.display_statistics(**data)
+
+
+# display_statistics function - plots data collected by a Recorder object (e.g. Recorder.open(path) for the data of a previous run):
+# (current contains the infections and deaths of the current, unfinished day of a running simulation)
+def display_statistics(recorder, current=None, **data):
+    import matplotlib.pyplot as plt     # matplotlib is only needed for plotting
+    daily_infections = recorder.series("n_daily_infections")
+    daily_deaths = recorder.series("n_daily_deaths")
+    if current is not None:
+        daily_infections = np.append(daily_infections, current[0])
+        daily_deaths = np.append(daily_deaths, current[1])
+    n = np.arange(len(recorder.series("n_infected"))) * recorder.every   # x axis (number of iterations)
+    days = np.arange(len(daily_deaths)) * recorder.day_length   # x axis for daily deaths and daily infections (number of days)
+
+    plt.style.use("ggplot")
+    for i in data:  # only plot data specified in kwargs
+        if data[i]:
+            if i == "infected":
+                plt.plot(n, recorder.series("n_infected"), label="Total number of infected people", color="red")
+            if i == "daily_infected":
+                plt.plot(days, daily_infections, label="Infections per day", color="orange")
+            if i == "dead":
+                plt.plot(n, recorder.series("n_dead"), label="Total deaths", color="black")
+            if i == "daily_deaths":
+                plt.plot(days, daily_deaths, label="Deaths per day", color="Purple")
+            if i == "healthy":
+                plt.plot(n, recorder.series("n_healthy"), label="Number of healthy people", color="cyan")
+            if i == "recovered":
+                plt.plot(n, recorder.series("n_recovered"), label="Number of recovered people", color="blue")
+
+    plt.grid(True)
+    plt.legend()
+    plt.show()
+
+
+# run function - runs a simulation without a screen and returns its statistical data:
+# (params are the parameters that differ from the module-level defaults, observers get called with the Simulation object after every iteration)
+def run(params=None, iterations=None, days=None, observers=(), seed=None, recorder=None):
+    simulation = Simulation(params, seed, recorder)
+    if iterations is None:
+        if days is None:
+            raise ValueError("either iterations or days must be given")
+        iterations = days*simulation.params.day_length
+    for _ in range(iterations):
+        simulation.update_world()
+        for observer in observers:
+            observer(simulation)
+    simulation.recorder.flush()
+    return simulation.statistics()
+
+
+# main function - runs the interactive simulation on screen:
+def main():
+    import pygame
+    renderer = Renderer()
+    Epidemic.initialise_world(n)
+    pause = False   # pauses simulation when True
+
+    # game loop:
+    while 1:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                exit()
+            if event.type == pygame.KEYDOWN:    # press return to pause/resume simulation
+                if event.key == pygame.K_RETURN:
+                    pause = not pause
+                    if pause:   # plot data when paused
+                        Epidemic.display_statistics(infected=total_number_of_infected_people, daily_infected=daily_number_of_infections, dead=total_number_of_deaths, daily_deaths=daily_number_of_deaths, healthy=number_of_healthy_people, recovered=number_of_recovered_people)
+
+        if not pause:   # run simulation when not paused
+            Epidemic.update_world()
+            renderer(Epidemic)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import itertools
+import json
+import time
+import tracemalloc
+
+import Epidemic
+from profiler import Profiler
+
+
+# benchmark function - runs update_world headless for every combination of the given parameter values:
+# (yields one result per combination with ticks/sec and agent-updates/sec of an uninstrumented run, and the peak traced
+# memory and per-phase profile of a second, instrumented run with the same seed, so tracing doesn't distort the timings)
+def benchmark(n=(2000,), number_of_populations=(9,), infection_radius=(5,), daily_travellers=(20,), iterations=100, params=None, seed=0):
+    for values in itertools.product(n, number_of_populations, infection_radius, daily_travellers):
+        case = dict(zip(("n", "number_of_populations", "infection_radius", "daily_travellers"), values))
+        simulation = Epidemic.Simulation(dict(params or {}, **case), seed)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            simulation.update_world()
+        seconds = time.perf_counter() - start
+
+        profiler = Profiler()
+        tracemalloc.start()
+        simulation = Epidemic.Simulation(dict(params or {}, **case), seed, profiler=profiler)
+        for _ in range(iterations):
+            simulation.update_world()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        yield dict(case, iterations=iterations, seconds=seconds, ticks_per_second=iterations/seconds, agent_updates_per_second=case["n"]*iterations/seconds,
+                   peak_memory=peak, profile=profiler.report())
+
+
+# main function - runs the benchmark from the command line:
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the epidemic simulation without a screen.")
+    parser.add_argument("--n", type=int, nargs="+", default=[2000, 20000, 200000])
+    parser.add_argument("--populations", type=int, nargs="+", default=[9])
+    parser.add_argument("--radius", type=int, nargs="+", default=[5])
+    parser.add_argument("--travellers", type=int, nargs="+", default=[20])
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--occupancy", default="dense")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="file the results get written to")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'n':>9} {'pops':>5} {'radius':>6} {'travel':>6} {'ticks/s':>9} {'updates/s':>11} {'peak MB':>8}")
+    for result in benchmark(args.n, args.populations, args.radius, args.travellers, args.iterations, {"occupancy": args.occupancy}, args.seed):
+        results.append(result)
+        print(f"{result['n']:>9} {result['number_of_populations']:>5} {result['infection_radius']:>6} {result['daily_travellers']:>6} "
+              f"{result['ticks_per_second']:>9.1f} {result['agent_updates_per_second']:>11.3g} {result['peak_memory']/2**20:>8.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
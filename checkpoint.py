@@ -0,0 +1,92 @@
+import json
+import os
+
+import numpy as np
+
+import Epidemic
+from streams import Streams
+
+world = ("width", "n", "number_of_populations", "world_size", "occupancy", "square_dist")     # parameters that can't be changed when loading (they define the world the saved individuals live in)
+
+
+# save function - writes the full state of a simulation to a checkpoint directory:
+# (one raw .npy file per array and a meta.json file with the parameters, counters and random number generator states;
+# the occupancy isn't saved since it follows from the positions of all individuals that aren't travelling; every file is
+# written next to its old version and replaced afterwards, so simulations loaded from the directory keep mapping the old files)
+def save(simulation, path):
+    os.makedirs(path, exist_ok=True)
+    engine = simulation.engine
+    arrays = {i: getattr(engine, i) for i in Epidemic.Engine.fields}
+    arrays["local"] = engine.local
+    for name, compartments in (("compartments", engine.compartments), ("travellers", engine.travellers)):   # members in their current order (the order random selections are made from)
+        arrays[name] = np.concatenate([compartments.ids(i) for i in range(len(compartments.counts))])
+    arrays["event_ticks"], arrays["event_ids"] = engine.scheduler.events()
+    for i in Streams.names:     # numbers of the current block that haven't been handed out yet
+        stream = getattr(simulation.rng, i)
+        arrays["stream_" + i] = stream.buffer[stream.used:]
+    for i in Epidemic.Recorder.tick_series + Epidemic.Recorder.day_series:
+        arrays[i] = simulation.recorder.series(i)
+    for i in simulation.recorder.snapshots:
+        arrays[f"snapshot_{i}"] = simulation.recorder.snapshot(i)
+    for name, array in arrays.items():
+        with open(os.path.join(path, name + ".npy.tmp"), "wb") as f:
+            np.save(f, array)
+        os.replace(os.path.join(path, name + ".npy.tmp"), os.path.join(path, name + ".npy"))
+    meta = {
+        "params": {i: list(j) if isinstance(j, tuple) else j for i, j in vars(simulation.params).items()},
+        "day": simulation.day, "iterations": simulation.iterations, "daily_infections": simulation.daily_infections, "daily_deaths": simulation.daily_deaths,
+        "tick": engine.tick, "next_departure": engine.next_departure, "departure_share": engine.departure_share, "free": engine.free,
+        "compartments": engine.compartments.counts.tolist(), "travellers": engine.travellers.counts.tolist(),
+        "seed": {"entropy": simulation.rng.seed.entropy, "spawn_key": list(simulation.rng.seed.spawn_key)},
+        "streams": {i: getattr(simulation.rng, i).generator.bit_generator.state for i in Streams.names},
+        "every": simulation.recorder.every, "snapshot_every": simulation.recorder.snapshot_every, "snapshots": list(simulation.recorder.snapshots),
+    }
+    with open(os.path.join(path, "meta.json.tmp"), "w") as f:    # written last, so it only ever describes complete files
+        json.dump(meta, f, default=int)
+    os.replace(os.path.join(path, "meta.json.tmp"), os.path.join(path, "meta.json"))
+
+
+# load function - restores a simulation from a checkpoint directory:
+# (agent arrays are memory-mapped copy-on-write, so any number of simulations can be forked from one checkpoint without
+# copying it; params can change parameters that don't change the world, e.g. infection_risk, and a seed gives the fork
+# its own random numbers, otherwise it continues exactly like the saved simulation)
+def load(path, params=None, seed=None, recorder=None, profiler=None):
+    for i in params or {}:
+        if i in world:
+            raise ValueError(f"parameter {i!r} can't be changed when loading a checkpoint")
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+
+    def array(name):
+        return np.load(os.path.join(path, name + ".npy"), mmap_mode="c").view(np.ndarray)
+
+    params = Epidemic.Parameters(**dict({i: tuple(j) if isinstance(j, list) else j for i, j in meta["params"].items()}, **(params or {})))
+    if seed is None:
+        rng = Streams(np.random.SeedSequence(meta["seed"]["entropy"], spawn_key=meta["seed"]["spawn_key"]))
+        for i in Streams.names:
+            stream = getattr(rng, i)
+            stream.generator.bit_generator.state = meta["streams"][i]
+            stream.buffer = np.array(array("stream_" + i))
+    else:
+        rng = Streams(seed)
+    simulation = Epidemic.Simulation.restore(params, rng, recorder or Epidemic.Recorder(every=meta["every"], snapshot_every=meta["snapshot_every"]), profiler)
+    engine = simulation.engine
+    for i in Epidemic.Engine.fields:
+        setattr(engine, i, array(i))
+    engine.local = np.array(array("local"))
+    engine.tick, engine.next_departure, engine.departure_share, engine.free = meta["tick"], meta["next_departure"], meta["departure_share"], meta["free"]
+    for name in ("compartments", "travellers"):
+        compartments = getattr(engine, name)
+        compartments.grow(engine.n)
+        members = array(name)
+        for i, count in enumerate(meta[name]):
+            compartments.add(i, members[:count])
+            members = members[count:]
+    engine.scheduler.schedule(array("event_ticks"), array("event_ids"))    # keeps the order of the events within each iteration
+    placed = np.flatnonzero(~engine.travelling)     # travellers (including individuals handed to another engine) don't occupy a pixel
+    engine.occupancy.set(engine.position[placed], placed)
+
+    simulation.daily_infections, simulation.daily_deaths = meta["daily_infections"], meta["daily_deaths"]
+    simulation.day, simulation.iterations = meta["day"], meta["iterations"]
+    simulation.recorder.restore(simulation, {i: array(i) for i in Epidemic.Recorder.tick_series + Epidemic.Recorder.day_series}, {i: array(f"snapshot_{i}") for i in meta["snapshots"]})
+    return simulation
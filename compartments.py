@@ -0,0 +1,57 @@
+import numpy as np
+
+
+# Compartments class - index-based registry that keeps track of which compartment every individual is in:
+# (each compartment stores its members densely in an array, every individual remembers its slot in that array,
+# so adding, removing and moving a batch of individuals costs O(batch size) regardless of the population size)
+class Compartments:
+    def __init__(self, number):
+        self.counts = np.zeros(number, dtype=np.int64)  # number of members of each compartment
+        self.members = [np.empty(0, dtype=np.intp) for _ in range(number)]  # members of each compartment (first counts[i] entries are valid)
+        self.slot = np.empty(0, dtype=np.intp)  # position of every individual within the members array of its compartment
+        self.marked = np.empty(0, dtype=bool)   # scratch flags used while removing a batch
+
+    # grow method - makes room for n individuals:
+    def grow(self, n):
+        if n <= len(self.slot):
+            return
+        self.slot = np.resize(self.slot, n)
+        self.marked = np.zeros(n, dtype=bool)
+        for i in range(len(self.members)):
+            members = np.empty(n, dtype=np.intp)
+            members[:self.counts[i]] = self.members[i][:self.counts[i]]
+            self.members[i] = members
+
+    # ids method - returns the members of a compartment (a view that becomes invalid with the next change, copy it to iterate while changing compartments):
+    def ids(self, compartment):
+        return self.members[compartment][:self.counts[compartment]]
+
+    # add method - adds individuals that aren't in any compartment yet to a compartment:
+    def add(self, compartment, ids):
+        ids = np.asarray(ids, dtype=np.intp)
+        count = self.counts[compartment]
+        self.members[compartment][count:count+len(ids)] = ids
+        self.slot[ids] = np.arange(count, count+len(ids))
+        self.counts[compartment] += len(ids)
+
+    # remove method - removes individuals from a compartment by moving members from the end of the compartment into their slots:
+    def remove(self, compartment, ids):
+        ids = np.asarray(ids, dtype=np.intp)
+        members = self.members[compartment]
+        count = self.counts[compartment] - len(ids)
+        holes = self.slot[ids]
+        holes = holes[holes < count]    # slots of removed individuals that stay within the compartment
+        self.marked[ids] = True
+        tail = members[count:self.counts[compartment]]
+        movers = tail[~self.marked[tail]]   # remaining members from the end of the compartment (one for each hole)
+        self.marked[ids] = False
+        members[holes] = movers
+        self.slot[movers] = holes
+        self.counts[compartment] = count
+
+    # move method - moves individuals from one compartment to another:
+    def move(self, ids, source, target):
+        if source == target or not len(ids):
+            return
+        self.remove(source, ids)
+        self.add(target, ids)
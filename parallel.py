@@ -0,0 +1,183 @@
+import multiprocessing
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import Epidemic
+from streams import Streams
+
+
+# Mirror class - position and infected status of every individual of a parallel simulation in shared memory:
+# (written by the workers after every step, read by observers such as the Renderer without copying)
+class Mirror:
+    def __init__(self, params, size, names=None):
+        self.params = params    # Parameters object of the simulation
+        self.blocks = [shared_memory.SharedMemory(name=i) for i in names] if names else \
+            [shared_memory.SharedMemory(create=True, size=max(size*8, 1)), shared_memory.SharedMemory(create=True, size=max(size, 1))]
+        self.names = [i.name for i in self.blocks]  # names used by the workers to attach to the shared memory
+        self.position = np.ndarray((size, 2), dtype=np.int32, buffer=self.blocks[0].buf)   # position of every individual (indexed by global id)
+        self.infected = np.ndarray(size, dtype=np.int8, buffer=self.blocks[1].buf)  # infected status of every individual (indexed by global id)
+
+    def close(self, unlink=False):
+        del self.position, self.infected    # release the views before closing the shared memory
+        for i in self.blocks:
+            i.close()
+            if unlink:
+                i.unlink()
+
+
+# work function - runs the simulation of one group of population squares in a worker process:
+# (individuals are known to the other processes by their global id, travellers to squares of other workers get handed over after every step)
+def work(connection, params, seed, squares, owners, names, size):
+    mirror = Mirror(params, size, names)
+    try:
+        simulation = Epidemic.Simulation(params, seed, squares=squares)
+        engine = simulation.engine
+        per_square = (params.n-1)//len(owners)
+        gid = np.concatenate([square*per_square + np.arange(per_square) for square in squares] + ([[len(owners)*per_square]] if 0 in squares else []))   # global id of every individual of the engine (-1 for handed over individuals)
+        worker = owners[squares[0]]
+        while True:
+            command, argument = connection.recv()
+            if command == "step":
+                iterations, incoming = argument
+                if incoming is not None:    # travellers handed over by other workers
+                    ids = engine.insert_travellers(incoming[0])
+                    gid = np.concatenate([gid, np.full(engine.n - len(gid), -1)])
+                    gid[ids] = incoming[1]
+                for _ in range(iterations):
+                    simulation.update_world()
+                present = gid >= 0
+                mirror.position[gid[present]] = engine.position[present]
+                mirror.infected[gid[present]] = engine.infected[present]
+                travellers = engine.travellers.ids(1)
+                leaving = travellers[owners[engine.population[travellers]] != worker]  # travellers to squares of other workers
+                destinations = owners[engine.population[leaving]]
+                outgoing = {}
+                for i in np.unique(destinations):
+                    ids = leaving[destinations == i]
+                    outgoing[int(i)] = (engine.remove_travellers(ids), gid[ids])
+                    gid[ids] = -1
+                connection.send(outgoing)
+            elif command == "statistics":
+                connection.send(simulation.statistics())
+            elif command == "stop":
+                return
+    except Exception:   # hand the traceback to the parent process instead of dying silently
+        connection.send(RuntimeError("worker failed:\n" + traceback.format_exc()))
+    finally:
+        mirror.close()
+        connection.close()
+
+
+# ParallelSimulation class - simulation whose population squares are split into groups that are stepped by separate worker processes:
+# (individuals only meet within their own square, so workers only exchange travellers; every worker gets its own region
+# seed derived from the given seed and travellers are handed over in a fixed order, so results are reproducible for a fixed number of workers)
+class ParallelSimulation:
+    def __init__(self, params=None, seed=None, workers=2, sync="day"):   # sync: "tick" or "day" (how often travellers get handed over)
+        if sync not in ("tick", "day"):
+            raise ValueError(f"unknown sync interval {sync!r}")
+        self.params = params if isinstance(params, Epidemic.Parameters) else Epidemic.Parameters(**(params or {}))
+        self.populations = Epidemic.Population(self.params.number_of_populations, self.params.square_dist, self.params.world_size)
+        number = len(self.populations.squares)
+        groups = np.array_split(np.arange(number), min(workers, number))   # contiguous groups of population squares
+        owners = np.empty(number, dtype=np.intp)    # worker of each population square
+        for i, group in enumerate(groups):
+            owners[group] = i
+        self.interval = 1 if sync == "tick" else self.params.day_length     # number of iterations between two handovers
+        size = self.size = (self.params.n-1)//number*number + 1  # number of individuals of all workers
+        self.engine = Mirror(self.params, size)     # global view of all individuals (used like an Engine object by observers)
+        self.iterations = 0
+        self.day = 0
+        self.incoming = [None for _ in groups]  # travellers to hand to each worker with the next step
+        self.connections = []
+        self.processes = []
+        context = multiprocessing.get_context()
+        for group, seed in zip(groups, Streams(seed).regions(len(groups))):
+            connection, child = context.Pipe()
+            process = context.Process(target=work, args=(child, self.params, seed, group.tolist(), owners, self.engine.names, size), daemon=True)
+            process.start()
+            self.connections.append(connection)
+            self.processes.append(process)
+        try:
+            self.step(0)    # fill the mirror with the initial state
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # step method - lets all workers simulate the given number of iterations and hands travellers over afterwards:
+    def step(self, iterations=None):
+        if iterations is None:
+            iterations = self.interval
+        for connection, incoming in zip(self.connections, self.incoming):
+            connection.send(("step", (iterations, incoming)))
+        outgoing = self.receive()   # wait for all workers
+        for i in range(len(self.connections)):  # collect travellers for each worker in the order of their old workers
+            parts = [j[i] for j in outgoing if i in j]
+            self.incoming[i] = ({k: np.concatenate([j[0][k] for j in parts]) for k in parts[0][0]}, np.concatenate([j[1] for j in parts])) if parts else None
+        self.iterations += iterations
+        self.day = -(-self.iterations // self.params.day_length)
+
+    # receive method - returns the replies of all workers (raises the exception of a failed worker):
+    def receive(self):
+        replies = []
+        for connection in self.connections:
+            try:
+                replies.append(connection.recv())
+            except EOFError:
+                replies.append(RuntimeError("worker process exited unexpectedly"))
+        for reply in replies:
+            if isinstance(reply, Exception):
+                raise reply
+        return replies
+
+    # update_world method - simulates one handover interval:
+    def update_world(self):
+        self.step()
+
+    # statistics method - returns the statistical data of all workers added up:
+    def statistics(self):
+        for connection in self.connections:
+            connection.send(("statistics", None))
+        statistics = self.receive()
+        total = {i: sum(np.asarray(j[i], dtype=np.int64) for j in statistics) for i in Epidemic.Recorder.tick_series + Epidemic.Recorder.day_series}
+        if total["n_healthy"][-1] + total["n_infected"][-1] + total["n_dead"][-1] != self.size:    # (the last rows are recorded before travellers are handed over)
+            raise RuntimeError("individuals have been lost or duplicated between workers")
+        total.update(day=self.day, iterations=self.iterations)
+        return total
+
+    # close method - stops the workers and frees the shared memory:
+    def close(self):
+        if not self.processes:  # already closed
+            return
+        try:
+            for connection in self.connections:
+                try:
+                    connection.send(("stop", None))
+                except OSError:     # worker has already exited (e.g. after an exception)
+                    pass
+            for process in self.processes:
+                process.join()
+        finally:
+            self.connections, self.processes = [], []
+            self.engine.close(unlink=True)
+
+
+# run function - runs a parallel simulation and returns its statistical data (see Epidemic.run):
+def run(params=None, iterations=None, days=None, workers=2, seed=None, sync="day", observers=()):
+    with ParallelSimulation(params, seed, workers, sync) as simulation:
+        if iterations is None:
+            if days is None:
+                raise ValueError("either iterations or days must be given")
+            iterations = days*simulation.params.day_length
+        while simulation.iterations < iterations:
+            simulation.step(min(simulation.interval, iterations - simulation.iterations))
+            for observer in observers:
+                observer(simulation)
+        return simulation.statistics()
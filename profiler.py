@@ -0,0 +1,52 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+
+# Profiler class - collects the time spent in each phase of an iteration and counters of the work done:
+class Profiler:
+    enabled = True
+
+    def __init__(self):
+        self.seconds = defaultdict(float)   # total time spent in each phase
+        self.calls = defaultdict(int)   # number of times each phase has been run
+        self.counters = defaultdict(int)    # counters of the work done (e.g. number of blocked moves)
+
+    # phase method - context manager that times one run of a phase:
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+            self.calls[name] += 1
+
+    # count method - adds a value to a counter:
+    def count(self, name, value=1):
+        self.counters[name] += int(value)
+
+    # report method - returns all timers and counters as a JSON-compatible dict:
+    def report(self):
+        return {"phases": {i: {"calls": self.calls[i], "seconds": self.seconds[i]} for i in self.seconds}, "counters": dict(self.counters)}
+
+    # dump method - writes the report to a JSON file:
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+# NullProfiler class - profiler used when profiling is disabled (every call does nothing):
+class NullProfiler:
+    enabled = False
+    context = nullcontext()
+
+    def phase(self, name):
+        return self.context
+
+    def count(self, name, value=1):
+        pass
+
+
+disabled = NullProfiler()   # shared profiler for all simulations that aren't profiled
@@ -0,0 +1,142 @@
+import json
+import os
+
+import numpy as np
+
+
+# Recorder class - collects the statistical data of a simulation in preallocated chunks of typed arrays:
+# (with a path, full chunks are appended to one raw column file per series and read back memory-mapped;
+# without a path, full chunks are kept in memory)
+class Recorder:
+    tick_series = ("n_infected", "n_healthy", "n_dead", "n_recovered")  # recorded every `every` iterations
+    day_series = ("n_daily_infections", "n_daily_deaths")   # recorded at the end of each day
+    dtype = np.int32
+
+    def __init__(self, path=None, every=1, chunk=4096, snapshot_every=None):
+        self.path = path    # directory the data gets written to (None for in-memory recording)
+        self.every = every  # number of iterations between two recorded rows of the tick series (day_length for daily rows)
+        self.snapshot_every = snapshot_every    # number of days between two snapshots of every individual's infected status (None for no snapshots)
+        self.day_length = None
+        self.buffers = {i: np.zeros(chunk, dtype=self.dtype) for i in self.tick_series + self.day_series}  # chunk currently being filled for each series
+        self.filled = dict.fromkeys(self.buffers, 0)    # number of rows in each buffer
+        self.written = dict.fromkeys(self.buffers, 0)   # number of rows of each buffer that have already been written
+        self.rows = dict.fromkeys(self.buffers, 0)  # number of rows written to disk (or memory) for each series
+        self.chunks = {i: [] for i in self.buffers}     # written rows of each series (only used without a path)
+        self.snapshots = {}     # day -> infected status of every individual (file name with a path)
+
+    # open classmethod - opens the data written by a previous run for reading:
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self = cls(path, meta["every"], 1, meta["snapshot_every"])
+        self.day_length = meta["day_length"]
+        self.rows = {i: os.path.getsize(self.file(i)) // np.dtype(self.dtype).itemsize for i in self.buffers}   # rows written before a crash are counted as well
+        self.snapshots = {int(i): j for i, j in meta["snapshots"].items()}
+        return self
+
+    # start method - called once by the simulation before its first iteration:
+    def start(self, simulation):
+        self.day_length = simulation.params.day_length
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+            for i in self.buffers:  # start with empty column files
+                open(self.file(i), "wb").close()
+            self.write_meta()   # the data can be opened even if the run never gets flushed
+        self.record_tick(simulation, 0)
+
+    # restore method - called instead of start by a simulation restored from a checkpoint with the rows and snapshots recorded before the checkpoint:
+    def restore(self, simulation, series, snapshots=None):
+        self.day_length = simulation.params.day_length
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+        for i in self.buffers:
+            rows = np.asarray(series[i], dtype=self.dtype)
+            if self.path:
+                rows.tofile(self.file(i))
+            else:
+                self.chunks[i] = [rows]     # memory-mapped rows are only copied when the series is read
+            self.rows[i] = len(rows)
+        for day, state in (snapshots or {}).items():
+            if self.path:
+                self.snapshots[day] = f"state_{day}.npy"
+                np.save(os.path.join(self.path, self.snapshots[day]), state)
+            else:
+                self.snapshots[day] = state
+        if self.path:
+            self.write_meta()
+
+    def file(self, name):
+        return os.path.join(self.path, name + ".bin")
+
+    # append method - appends one row to a series (writes the buffer when it is full):
+    def append(self, name, value):
+        if self.filled[name] == len(self.buffers[name]):
+            self.write(name)
+        self.buffers[name][self.filled[name]] = value
+        self.filled[name] += 1
+
+    # write method - writes the rows of a buffer that haven't been written yet:
+    def write(self, name):
+        rows = self.buffers[name][self.written[name]:self.filled[name]]
+        if self.path:
+            with open(self.file(name), "ab") as f:
+                rows.tofile(f)
+        else:
+            self.chunks[name].append(rows.copy())
+        self.rows[name] += len(rows)
+        self.written[name] = self.filled[name]
+        if self.filled[name] == len(self.buffers[name]):    # start a new chunk
+            self.filled[name] = self.written[name] = 0
+
+    # flush method - writes all buffered rows and the metadata to disk:
+    def flush(self):
+        if not self.path:
+            return
+        for i in self.buffers:
+            self.write(i)
+        self.write_meta()
+
+    # write_meta method - writes the metadata needed to open the data with Recorder.open:
+    def write_meta(self):
+        meta = {"every": self.every, "day_length": self.day_length, "snapshot_every": self.snapshot_every, "rows": self.rows, "snapshots": self.snapshots}
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    # record_tick method - records the counts of the tick series after the given iteration:
+    def record_tick(self, simulation, iteration):
+        if iteration % self.every:
+            return
+        counts = simulation.engine.compartments.counts  # maintained by the engine (no scan over all individuals)
+        self.append("n_infected", counts[1])
+        self.append("n_healthy", counts[0]+counts[2])   # healthy individuals include recovered ones
+        self.append("n_dead", counts[3])
+        self.append("n_recovered", counts[2])
+
+    # record_day method - records the daily counts (and a snapshot every snapshot_every days) at the end of the given day:
+    def record_day(self, simulation, day):
+        self.append("n_daily_infections", simulation.daily_infections)
+        self.append("n_daily_deaths", simulation.daily_deaths)
+        if self.snapshot_every and not day % self.snapshot_every:
+            if self.path:
+                self.snapshots[day] = f"state_{day}.npy"
+                np.save(os.path.join(self.path, self.snapshots[day]), simulation.engine.infected)
+            else:
+                self.snapshots[day] = simulation.engine.infected.copy()
+            self.flush()
+
+    # series method - returns all rows of a series (memory-mapped when written to disk):
+    def series(self, name):
+        if self.path:
+            if self.filled[name] > self.written[name]:
+                self.flush()
+            if not self.rows[name]:
+                return np.zeros(0, dtype=self.dtype)
+            return np.memmap(self.file(name), dtype=self.dtype, mode="r", shape=(self.rows[name],))
+        return np.concatenate(self.chunks[name] + [self.buffers[name][self.written[name]:self.filled[name]]])
+
+    # snapshot method - returns the infected status of every individual at the end of the given day:
+    def snapshot(self, day):
+        if self.path:
+            return np.load(os.path.join(self.path, self.snapshots[day]), mmap_mode="r")
+        return self.snapshots[day]
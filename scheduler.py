@@ -0,0 +1,36 @@
+import numpy as np
+
+
+# Scheduler class - calendar queue of events keyed by the iteration they happen in:
+# (each bucket holds the batches of individuals whose event fires in that iteration, so scheduling a batch costs one
+# sort and popping an iteration only touches the individuals that are due)
+class Scheduler:
+    def __init__(self):
+        self.calendar = {}  # iteration -> list of arrays of individuals with an event in that iteration
+
+    def __len__(self):  # number of pending events
+        return sum(len(i) for batches in self.calendar.values() for i in batches)
+
+    # schedule method - adds an event for every individual at the corresponding iteration:
+    def schedule(self, ticks, ids):
+        ticks, ids = np.asarray(ticks), np.asarray(ids, dtype=np.intp)
+        if not len(ids):
+            return
+        order = np.argsort(ticks, kind="stable")
+        ticks, ids = ticks[order], ids[order]
+        starts = np.flatnonzero(np.r_[True, ticks[1:] != ticks[:-1]])  # first event of each distinct iteration
+        for tick, batch in zip(ticks[starts], np.split(ids, starts[1:])):
+            self.calendar.setdefault(int(tick), []).append(batch)
+
+    # pop method - removes and returns all individuals with an event at the given iteration:
+    def pop(self, tick):
+        batches = self.calendar.pop(tick, None)
+        return np.concatenate(batches) if batches else np.empty(0, dtype=np.intp)
+
+    # events method - returns (iteration, individual) of all pending events:
+    def events(self):
+        if not self.calendar:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.intp)
+        ticks = np.concatenate([np.full(sum(len(i) for i in batches), tick, dtype=np.int64) for tick, batches in self.calendar.items()])
+        ids = np.concatenate([np.concatenate(batches) for batches in self.calendar.values()])
+        return ticks, ids
@@ -0,0 +1,153 @@
+import numpy as np
+
+
+# CellList class - uniform grid spatial index used to find all pairs of individuals within a given radius:
+# (the cell side length equals the radius, so only the 3x3 block of cells around a point has to be searched;
+# cells are keyed by population square as well, so individuals of different populations never meet)
+class CellList:
+    neighbours = np.mgrid[-1:2, -1:2].reshape(2, -1).T     # cell offsets of the 3x3 block around a cell
+    bias = 1 << 20  # offset that keeps negative cell coordinates positive inside the key
+
+    def __init__(self, radius):
+        self.radius = radius    # search radius (euclidean distance)
+        self.cell = max(radius, 1)  # side length of each cell
+        self.keys = np.empty(0, dtype=np.int64)     # sorted cell key of every indexed point
+        self.ids = np.empty(0, dtype=np.intp)   # id of every indexed point (same order as keys)
+        self.positions = np.empty((0, 2))   # position of every indexed point (same order as keys)
+
+    # key method - packs population index and cell coordinates into a single sortable integer:
+    def key(self, groups, cells):
+        cells = cells.astype(np.int64) + self.bias
+        return (groups.astype(np.int64) << 42) | (cells[..., 0] << 21) | cells[..., 1]
+
+    # build method - (re)builds the index for the given points:
+    def build(self, positions, groups, ids):
+        keys = self.key(groups, np.floor_divide(positions, self.cell))
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.ids = np.asarray(ids)[order]
+        self.positions = positions[order]
+
+    # query method - returns (query row, indexed id) for every indexed point within the radius of a query point of the same group:
+    def query(self, positions, groups):
+        cells = np.floor_divide(positions, self.cell)[:, None, :] + self.neighbours[None]  # 3x3 block of cells around every query point
+        keys = self.key(np.asarray(groups)[:, None], cells).ravel()
+        lo = np.searchsorted(self.keys, keys, side="left")  # range of indexed points in each cell
+        lengths = np.searchsorted(self.keys, keys, side="right") - lo
+        rows = np.repeat(np.arange(len(keys)) // len(self.neighbours), lengths)    # query row of every candidate pair
+        matched = np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())  # position of every candidate pair's point in the index
+        distance = self.positions[matched] - positions[rows]
+        close = np.einsum("ij,ij->i", distance, distance) <= self.radius**2     # only keep pairs within the euclidean radius
+        return rows[close], self.ids[matched[close]]
+
+
+# pixel_keys function - packs pixel coordinates into unique integers (used to detect individuals competing for the same pixel):
+def pixel_keys(positions):
+    positions = np.asarray(positions, dtype=np.int64) + (1 << 30)  # coordinates between -2**30 and 2**30 (keys stay positive)
+    return (positions[..., 0] << 32) | positions[..., 1]
+
+
+# DenseGrid class - occupancy backend that stores the index of the individual on every pixel of the world in an int32 matrix:
+# (fastest lookups, memory proportional to the world area)
+class DenseGrid:
+    def __init__(self, size, capacity=0):
+        self.grid = np.full(size, -1, dtype=np.int32)   # index of the individual on each pixel (-1 for empty pixels)
+
+    # get method - returns the index of the individual on each given pixel (-1 for empty pixels):
+    def get(self, positions):
+        positions = np.asarray(positions)
+        return self.grid[positions[..., 0], positions[..., 1]]
+
+    # set method - puts individuals on the given (empty) pixels:
+    def set(self, positions, ids):
+        positions = np.asarray(positions)
+        self.grid[positions[..., 0], positions[..., 1]] = ids
+
+    # clear method - removes the individuals from the given pixels:
+    def clear(self, positions):
+        positions = np.asarray(positions)
+        self.grid[positions[..., 0], positions[..., 1]] = -1
+
+
+# SparseGrid class - occupancy backend that stores occupied pixels in an open-addressing hash table:
+# (lookups and updates are batched and probe all keys at once, memory proportional to the number of individuals)
+class SparseGrid:
+    empty = -1  # key of a slot that has never been used
+    deleted = -2    # key of a slot whose pixel has been cleared (probing continues past it)
+
+    def __init__(self, size=None, capacity=0):
+        self.count = 0  # number of occupied pixels
+        self.used = 0   # number of slots that aren't empty (occupied or deleted)
+        self.allocate(max(2*capacity, 64))
+
+    # allocate method - creates an empty table with room for at least the given number of slots:
+    def allocate(self, slots):
+        self.bits = int(np.ceil(np.log2(slots)))
+        self.keys = np.full(1 << self.bits, self.empty, dtype=np.int64)     # pixel key of each slot
+        self.values = np.full(1 << self.bits, -1, dtype=np.int32)   # index of the individual of each slot
+        self.count = self.used = 0
+
+    # hash method - returns the first slot to probe for each key (fibonacci hashing):
+    def hash(self, keys):
+        return ((keys.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(64 - self.bits)).astype(np.intp)
+
+    # find method - returns the slot of each key (-1 for keys that aren't in the table):
+    def find(self, keys):
+        slots = np.full(len(keys), -1, dtype=np.intp)
+        probe = self.hash(keys)
+        pending = np.arange(len(keys))
+        mask = len(self.keys) - 1
+        while len(pending):
+            found = self.keys[probe[pending]]
+            hit = found == keys[pending]
+            slots[pending[hit]] = probe[pending[hit]]
+            pending = pending[~hit & (found != self.empty)]     # keep probing past other keys and deleted slots
+            probe[pending] = (probe[pending] + 1) & mask
+        return slots
+
+    # get method - returns the index of the individual on each given pixel (-1 for empty pixels):
+    def get(self, positions):
+        positions = np.asarray(positions)
+        slots = self.find(pixel_keys(positions).ravel())
+        return np.where(slots >= 0, self.values[slots], -1).reshape(positions.shape[:-1])
+
+    # set method - puts individuals on the given (empty, distinct) pixels:
+    def set(self, positions, ids):
+        keys = pixel_keys(positions).ravel()
+        ids = np.broadcast_to(np.asarray(ids, dtype=np.int32).ravel(), keys.shape)
+        if 2*(self.used + len(keys)) > len(self.keys):  # keep the table at most half full
+            self.rehash(2*(self.count + len(keys)))
+        probe = self.hash(keys)
+        pending = np.arange(len(keys))
+        mask = len(self.keys) - 1
+        while len(pending):
+            slots = probe[pending]
+            free = self.keys[slots] < 0
+            _, first = np.unique(slots[free], return_index=True)    # only one key can take a free slot per round
+            winners = pending[free][first]
+            self.used += np.count_nonzero(self.keys[probe[winners]] == self.empty)
+            self.keys[probe[winners]] = keys[winners]
+            self.values[probe[winners]] = ids[winners]
+            taken = np.zeros(len(keys), dtype=bool)
+            taken[winners] = True
+            pending = pending[~taken[pending]]
+            occupied = self.keys[probe[pending]] >= 0
+            probe[pending[occupied]] = (probe[pending[occupied]] + 1) & mask    # move on from occupied slots
+        self.count += len(keys)
+
+    # clear method - removes the individuals from the given pixels:
+    def clear(self, positions):
+        slots = self.find(pixel_keys(positions).ravel())
+        slots = slots[slots >= 0]
+        self.keys[slots] = self.deleted
+        self.values[slots] = -1
+        self.count -= len(slots)
+
+    # rehash method - rebuilds the table with room for the given number of pixels (drops deleted slots):
+    def rehash(self, capacity):
+        occupied = self.keys >= 0
+        keys, values = self.keys[occupied], self.values[occupied]
+        self.allocate(max(2*capacity, 64))
+        if len(keys):
+            positions = np.stack([(keys >> 32) - (1 << 30), (keys & 0xFFFFFFFF) - (1 << 30)], axis=-1)
+            self.set(positions, values)
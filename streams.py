@@ -0,0 +1,61 @@
+import numpy as np
+
+
+# Stream class - one reproducible stream of random numbers that hands out uniforms from pre-generated blocks:
+# (small requests are served from the current block, so drawing a few numbers doesn't pay the cost of a generator call)
+class Stream:
+    def __init__(self, seed, block=4096):
+        self.generator = np.random.Generator(np.random.PCG64(seed))     # numpy generator the blocks are drawn from
+        self.block = block  # number of uniforms generated at once
+        self.buffer = np.empty(0)   # current block of uniforms
+        self.used = 0   # number of uniforms of the current block that have been handed out
+
+    # random method - returns uniforms in [0, 1) (a float for size=None):
+    def random(self, size=None):
+        count = 1 if size is None else int(np.prod(size))
+        if count > self.block:  # large requests are drawn directly
+            values = self.generator.random(count)
+        else:
+            if self.used + count > len(self.buffer):
+                self.buffer = np.concatenate([self.buffer[self.used:], self.generator.random(self.block)])
+                self.used = 0
+            values = self.buffer[self.used:self.used+count]
+            self.used += count
+        return values[0] if size is None else values.reshape(size)
+
+    # integers method - returns integers in [low, high) (low and high can be arrays):
+    def integers(self, low, high, size=None):
+        if size is None:
+            size = np.broadcast(low, high).shape or None
+        values = low + np.floor(self.random(size) * (np.asarray(high) - low)).astype(np.int64)
+        return values if size is not None else int(values)
+
+    # geometric method - returns the number of trials until the first success with probability p (inverse transform of uniforms):
+    def geometric(self, p, size=None):
+        if p >= 1:
+            return np.ones(size, dtype=np.int64) if size is not None else 1
+        values = np.floor(np.log1p(-self.random(size)) / np.log1p(-p)).astype(np.int64) + 1
+        return values if size is not None else int(values)
+
+    # choice method - returns a random element of a sequence:
+    def choice(self, options):
+        return options[self.integers(0, len(options))]
+
+    # permutation method - returns a random permutation of range(n):
+    def permutation(self, n):
+        return self.generator.permutation(n)
+
+
+# Streams class - independent random number streams for each phase of a simulation, all derived from one seed:
+# (drawing more numbers in one phase never changes the numbers of another phase, and a fixed seed gives bit-identical trajectories)
+class Streams:
+    names = ("placement", "movement", "infection", "illness", "travel")
+
+    def __init__(self, seed=None, block=4096):
+        self.seed = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)   # root of all streams
+        for name, child in zip(self.names, self.seed.spawn(len(self.names))):
+            setattr(self, name, Stream(child, block))
+
+    # regions method - returns independent seeds for the given number of regions (e.g. the workers of a parallel simulation):
+    def regions(self, count):
+        return [np.random.SeedSequence(self.seed.entropy, spawn_key=self.seed.spawn_key + (len(self.names), i)) for i in range(count)]
@@ -0,0 +1,47 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import Epidemic
+
+series = ("n_infected", "n_dead", "n_daily_infections", "n_daily_deaths")   # statistical data that gets aggregated over replicates
+
+
+# replicate function - runs one replicate in a worker process and returns its statistical data:
+def replicate(params, iterations, days, seed):
+    statistics = Epidemic.run(params, iterations=iterations, days=days, seed=seed)
+    return {i: np.asarray(statistics[i], dtype=np.int64) for i in series}
+
+
+# aggregate function - summarises the statistical data of all replicates of one parameter combination:
+# (mean and quantiles of every series, taken over replicates for each iteration or day)
+def aggregate(results, quantiles=(0.05, 0.5, 0.95)):
+    summary = {}
+    for i in series:
+        data = np.stack([result[i] for result in results])
+        summary[i] = {"mean": data.mean(axis=0), "quantiles": dict(zip(quantiles, np.quantile(data, quantiles, axis=0)))}
+    return summary
+
+
+# sweep function - runs replicates of every parameter combination of the grid in a process pool:
+# (grid maps parameter names to lists of values, params are fixed parameters for all runs;
+# yields (parameters, summary) for every parameter combination as soon as all of its replicates have finished)
+def sweep(grid, replicates=10, iterations=None, days=None, params=None, seed=0, processes=None, quantiles=(0.05, 0.5, 0.95)):
+    names = list(grid)
+    combinations = [dict(params or {}, **dict(zip(names, values))) for values in itertools.product(*(grid[i] for i in names))]
+    for i in combinations:  # fail before starting any worker
+        Epidemic.Parameters(**i)
+    seeds = np.random.SeedSequence(seed).spawn(len(combinations)*replicates)   # independent seed for every replicate (same results for any number of processes)
+    results = [[] for _ in combinations]
+    with ProcessPoolExecutor(processes) as pool:
+        jobs = {}
+        for i, combination in enumerate(combinations):
+            for j in range(replicates):
+                jobs[pool.submit(replicate, combination, iterations, days, seeds[i*replicates+j])] = i
+        for job in as_completed(jobs):
+            i = jobs[job]
+            results[i].append(job.result())
+            if len(results[i]) == replicates:
+                yield combinations[i], aggregate(results[i], quantiles)
+                results[i] = None   # free memory of finished combinations